@@ -1,44 +1,268 @@
+import hashlib
+import itertools
+import os
+import queue
 import random
+import threading
 from collections import Counter, deque
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
-import exifread
-import imagesize
-from PySide6.QtCore import (QAbstractListModel, QModelIndex, QSize, Qt, Signal,
-                            Slot)
-from PySide6.QtGui import QIcon, QImageReader, QPixmap
+from PySide6.QtCore import (QAbstractListModel, QModelIndex, QObject,
+                            QRunnable, QSize, QStandardPaths, Qt, QThreadPool,
+                            Signal, Slot)
+from PySide6.QtGui import (QIcon, QImageIOHandler, QImageReader, QPixmap,
+                           QPixmapCache)
 from PySide6.QtWidgets import QMessageBox
 
 from utils.image import Image
-from utils.utils import get_confirmation_dialog_reply
+from utils.image_header import get_image_dimensions
+from utils.utils import get_confirmation_dialog_reply, pluralize
 
 UNDO_STACK_SIZE = 32
+# The number of images to load before adding them to the model.
+LOAD_BATCH_SIZE = 256
+THUMBNAIL_MEMORY_CACHE_SIZE_KB = 256 * 1024
+THUMBNAIL_DISK_CACHE_SIZE_BYTES = 1024 * 1024 * 1024
 
 
-def get_file_paths(directory_path: Path) -> set[Path]:
+def get_image_and_text_file_paths(
+        directory_path: Path,
+        is_canceled: Callable[[], bool]) -> tuple[list[Path], set[Path]]:
     """
-    Recursively get all file paths in a directory, including those in
-    subdirectories.
+    Recursively get the paths of all image files and text files in a
+    directory, including those in subdirectories. The search stops early,
+    returning only some of the paths, if `is_canceled()` returns `True`.
     """
-    file_paths = set()
-    for path in directory_path.iterdir():
-        if path.is_file():
-            file_paths.add(path)
-        elif path.is_dir():
-            file_paths.update(get_file_paths(path))
-    return file_paths
+    image_paths = []
+    text_file_paths = set()
+    add_image_and_text_file_paths(directory_path, image_paths,
+                                  text_file_paths, is_canceled)
+    return image_paths, text_file_paths
+
+
+def add_image_and_text_file_paths(directory_path: Path | str,
+                                  image_paths: list[Path],
+                                  text_file_paths: set[Path],
+                                  is_canceled: Callable[[], bool]):
+    if is_canceled():
+        return
+    # `os.scandir()` gets the file type of each entry along with its name, so
+    # unlike `Path.is_file()` and `Path.is_dir()`, no extra `stat` call is
+    # needed for each entry that is not a symbolic link.
+    with os.scandir(directory_path) as entries:
+        for entry in entries:
+            if entry.is_file():
+                suffix = os.path.splitext(entry.name)[1]
+                if suffix == '.txt':
+                    text_file_paths.add(Path(entry.path))
+                elif suffix.lower() not in ('.json', '.jsonl'):
+                    image_paths.append(Path(entry.path))
+            elif entry.is_dir():
+                add_image_and_text_file_paths(entry.path, image_paths,
+                                              text_file_paths, is_canceled)
+
+
+def get_path_sort_key(path: Path) -> tuple[str, ...]:
+    """
+    Get a key that sorts paths in the same order as comparing the paths
+    themselves. Comparing the keys is much faster because the strings are
+    compared directly instead of through `PurePath.__lt__()`.
+    """
+    # Paths are compared case-insensitively on Windows.
+    if os.name == 'nt':
+        return tuple(part.lower() for part in path.parts)
+    return path.parts
+
+
+def get_thumbnail_key(image_path: Path, width: int) -> str | None:
+    """
+    Get a key that identifies the thumbnail of an image. The key changes when
+    the image is modified.
+    """
+    try:
+        stat_result = image_path.stat()
+    except OSError:
+        return None
+    key_string = (f'{image_path}|{stat_result.st_mtime_ns}|'
+                  f'{stat_result.st_size}|{width}')
+    return hashlib.blake2b(key_string.encode(), digest_size=16).hexdigest()
+
+
+def prune_thumbnail_cache(thumbnail_directory_path: Path,
+                          max_size_bytes: int):
+    """
+    Delete the least recently used thumbnails from the disk cache until its
+    total size is at most three quarters of the maximum size, if it is larger
+    than the maximum size. Thumbnails of modified, moved or deleted images
+    are never used again, so without this the cache would keep growing.
+    """
+    thumbnails = []
+    total_size = 0
+    try:
+        subdirectories = list(os.scandir(thumbnail_directory_path))
+    except OSError:
+        return
+    for subdirectory in subdirectories:
+        if not subdirectory.is_dir():
+            continue
+        try:
+            with os.scandir(subdirectory.path) as entries:
+                for entry in entries:
+                    try:
+                        stat_result = entry.stat()
+                    except OSError:
+                        continue
+                    thumbnails.append((stat_result.st_mtime_ns,
+                                       stat_result.st_size, entry.path))
+                    total_size += stat_result.st_size
+        except OSError:
+            continue
+    if total_size <= max_size_bytes:
+        return
+    # The modification time of a thumbnail is updated whenever it is used.
+    thumbnails.sort()
+    target_size = max_size_bytes * 3 // 4
+    for _, size, path in thumbnails:
+        if total_size <= target_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_size -= size
+
+
+def load_image(image_path: Path, separator: str,
+               text_file_paths: set[Path]) -> Image:
+    """
+    Get the dimensions of an image and load its tags from its text file, if
+    it has one.
+    """
+    try:
+        dimensions = get_image_dimensions(image_path)
+    except (ValueError, OSError) as exception:
+        print(f'Failed to get dimensions for {image_path}: {exception}')
+        dimensions = None
+    tags = []
+    text_file_path = image_path.with_suffix('.txt')
+    if text_file_path in text_file_paths:
+        # `errors='replace'` inserts a replacement marker such as '?' when
+        # there is malformed data.
+        caption = text_file_path.read_text(encoding='utf-8', errors='replace')
+        if caption:
+            tags = caption.split(separator)
+            tags = [tag.strip() for tag in tags]
+            tags = [tag for tag in tags if tag]
+    return Image(image_path, dimensions, tags)
+
+
+def replace_in_captions(captions: list[str], find_text: str,
+                        replace_text: str) -> list[str]:
+    """
+    Replace text in multiple captions with a single `str.replace()` call on
+    the joined captions instead of one call per caption.
+    """
+    if not captions:
+        return []
+    # The text cannot match across captions, and the result can be split back
+    # into the captions, as long as the delimiter does not appear in the
+    # captions or in the texts.
+    delimiter = '\0'
+    joined_captions = delimiter.join(captions)
+    if (delimiter in find_text or delimiter in replace_text
+            or joined_captions.count(delimiter) != len(captions) - 1):
+        return [caption.replace(find_text, replace_text)
+                for caption in captions]
+    return joined_captions.replace(find_text, replace_text).split(delimiter)
 
 
 @dataclass
 class HistoryItem:
     action_name: str
-    tags: list[list[str]]
+    # The tags before the action of each image changed by the action, keyed by
+    # the index of the image.
+    image_tags: dict[int, list[str]]
     should_ask_for_confirmation: bool
 
 
+class DirectoryLoaderSignals(QObject):
+    # The parameter must be declared as `list` instead of `list[Image]` for it
+    # to work.
+    batch_loaded = Signal(list)
+    # Emitted with the error messages of the images that failed to load.
+    finished = Signal(list)
+
+
+class DirectoryLoader(QRunnable):
+    """
+    Load the images in a directory in a thread pool thread, emitting them in
+    batches so that they can be shown before the whole directory is loaded.
+    """
+
+    def __init__(self, directory_path: Path, separator: str):
+        super().__init__()
+        self.directory_path = directory_path
+        self.separator = separator
+        self.signals = DirectoryLoaderSignals()
+        self.is_canceled = False
+        self.error_messages: list[str] = []
+
+    def run(self):
+        try:
+            self.load_images()
+        finally:
+            self.signals.finished.emit(self.error_messages)
+
+    def load_image(self, image_path: Path,
+                   text_file_paths: set[Path]) -> tuple[Image, str | None]:
+        """
+        Load an image, or get an image without tags and an error message if it
+        fails to load, so that one failed image does not stop the whole
+        directory from loading.
+        """
+        try:
+            return load_image(image_path, self.separator,
+                              text_file_paths), None
+        except Exception as exception:
+            return Image(image_path, None), f'{image_path}: {exception}'
+
+    def load_images(self):
+        image_paths, text_file_paths = get_image_and_text_file_paths(
+            self.directory_path, lambda: self.is_canceled)
+        if self.is_canceled:
+            return
+        # Reading the image headers and text files is I/O-bound, so use
+        # threads to read multiple files concurrently.
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda image_path: self.load_image(image_path,
+                                                   text_file_paths),
+                image_paths)
+            batch = []
+            for image, error_message in results:
+                if self.is_canceled:
+                    executor.shutdown(cancel_futures=True)
+                    return
+                if error_message is not None:
+                    self.error_messages.append(error_message)
+                batch.append(image)
+                if len(batch) == LOAD_BATCH_SIZE:
+                    self.signals.batch_loaded.emit(batch)
+                    batch = []
+            if batch:
+                self.signals.batch_loaded.emit(batch)
+
+
 class ImageListModel(QAbstractListModel):
     update_undo_and_redo_actions_requested = Signal()
+    directory_loaded = Signal()
+    # The parameter must be declared as `list` instead of `list[Path]` for it
+    # to work.
+    tags_write_failed = Signal(list)
 
     def __init__(self, image_list_image_width: int, separator: str):
         super().__init__()
@@ -48,6 +272,19 @@ class ImageListModel(QAbstractListModel):
         self.undo_stack = deque(maxlen=UNDO_STACK_SIZE)
         self.redo_stack = []
         self.proxy_image_list_model = None
+        self.write_queue: queue.Queue[tuple[Path, str]] = queue.Queue()
+        self.writer_thread = threading.Thread(
+            target=self.write_queued_captions, daemon=True)
+        self.writer_thread.start()
+        self.tags_write_failed.connect(self.show_tags_write_error)
+        self.directory_loader: DirectoryLoader | None = None
+        QPixmapCache.setCacheLimit(THUMBNAIL_MEMORY_CACHE_SIZE_KB)
+        self.thumbnail_directory_path = Path(QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.CacheLocation)) / 'thumbnails'
+        threading.Thread(target=prune_thumbnail_cache,
+                         args=(self.thumbnail_directory_path,
+                               THUMBNAIL_DISK_CACHE_SIZE_BYTES),
+                         daemon=True).start()
 
     def rowCount(self, parent=None) -> int:
         return len(self.images)
@@ -60,98 +297,258 @@ class ImageListModel(QAbstractListModel):
             # The text shown next to the thumbnail in the image list.
             text = image.path.name
             if image.tags:
-                caption = self.separator.join(image.tags)
+                caption = image.get_caption(self.separator)
                 text += f'\n{caption}'
             return text
         if role == Qt.DecorationRole:
             # The thumbnail. If the image already has a thumbnail stored, use
-            # it. Otherwise, generate a thumbnail and save it to the image.
+            # it. Otherwise, get a cached or newly generated thumbnail and save
+            # it to the image.
             if image.thumbnail:
                 return image.thumbnail
-            image_reader = QImageReader(str(image.path))
-            # Rotate the image based on the orientation tag.
-            image_reader.setAutoTransform(True)
-            pixmap = QPixmap.fromImageReader(image_reader).scaledToWidth(
-                self.image_list_image_width, Qt.SmoothTransformation)
+            pixmap = self.get_thumbnail_pixmap(image)
             thumbnail = QIcon(pixmap)
             image.thumbnail = thumbnail
+            # The pixmap is null if the image could not be read. Keep the
+            # expected size then so that the row does not collapse.
+            if not pixmap.isNull():
+                image.thumbnail_size = pixmap.size()
             return thumbnail
         if role == Qt.SizeHintRole:
-            if image.thumbnail:
-                return image.thumbnail.availableSizes()[0]
-            dimensions = image.dimensions
-            if not dimensions:
-                return QSize(self.image_list_image_width,
-                             self.image_list_image_width)
-            width, height = dimensions
-            # Scale the dimensions to the image width.
+            # The size hint is requested for every visible row whenever the
+            # image list is painted, so it is computed once and stored in the
+            # image.
+            if image.thumbnail_size is None:
+                image.thumbnail_size = self.get_expected_thumbnail_size(image)
+            return image.thumbnail_size
+
+    def get_expected_thumbnail_size(self, image: Image) -> QSize:
+        """
+        Get the size that the thumbnail of an image will have, based on the
+        image dimensions.
+        """
+        dimensions = image.dimensions
+        if not dimensions:
             return QSize(self.image_list_image_width,
-                         int(self.image_list_image_width * height / width))
+                         self.image_list_image_width)
+        width, height = dimensions
+        # Scale the dimensions to the image width.
+        return QSize(self.image_list_image_width,
+                     int(self.image_list_image_width * height / width))
+
+    def generate_thumbnail_pixmap(self, image: Image) -> QPixmap:
+        image_reader = QImageReader(str(image.path))
+        # Rotate the image based on the orientation tag.
+        image_reader.setAutoTransform(True)
+        # Smooth scaling a large image is slow, so first let the reader scale
+        # it down by a power of two while decoding, which JPEG decoders can do
+        # cheaply, as long as it stays at least twice the thumbnail width. The
+        # smaller side is used because the image might be rotated after it is
+        # read. Readers that cannot scale while decoding would instead decode
+        # the full image and scale it themselves, adding a second scaling pass.
+        image_size = image_reader.size()
+        if (image_size.isValid() and image_reader.supportsOption(
+                QImageIOHandler.ImageOption.ScaledSize)):
+            min_side_length = min(image_size.width(), image_size.height())
+            scale_divisor = 1
+            while (min_side_length // (scale_divisor * 2)
+                   >= self.image_list_image_width * 2):
+                scale_divisor *= 2
+            if scale_divisor > 1:
+                image_reader.setScaledSize(QSize(
+                    image_size.width() // scale_divisor,
+                    image_size.height() // scale_divisor))
+        return QPixmap.fromImageReader(image_reader).scaledToWidth(
+            self.image_list_image_width, Qt.SmoothTransformation)
+
+    def get_thumbnail_pixmap(self, image: Image) -> QPixmap:
+        """
+        Get the thumbnail of an image from the in-memory cache or the disk
+        cache, or generate it and add it to both caches.
+        """
+        thumbnail_key = get_thumbnail_key(image.path,
+                                          self.image_list_image_width)
+        if thumbnail_key is None:
+            return self.generate_thumbnail_pixmap(image)
+        pixmap = QPixmap()
+        if QPixmapCache.find(thumbnail_key, pixmap):
+            return pixmap
+        thumbnail_path = (self.thumbnail_directory_path / thumbnail_key[:2]
+                          / f'{thumbnail_key}.png')
+        if pixmap.load(str(thumbnail_path)):
+            # Mark the thumbnail as recently used so that it is not pruned.
+            try:
+                os.utime(thumbnail_path)
+            except OSError:
+                pass
+        else:
+            pixmap = self.generate_thumbnail_pixmap(image)
+            if pixmap.isNull():
+                return pixmap
+            try:
+                thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+                pixmap.save(str(thumbnail_path), 'PNG')
+            except OSError as exception:
+                print(f'Failed to cache thumbnail for {image.path}: '
+                      f'{exception}')
+        QPixmapCache.insert(thumbnail_key, pixmap)
+        return pixmap
 
     def load_directory(self, directory_path: Path):
+        """
+        Start loading the images in a directory in the background.
+        `directory_loaded` is emitted when all the images have been loaded.
+        """
+        self.cancel_loading()
+        # Make sure that the text files are up to date before reading them.
+        self.flush_writes()
+        self.beginResetModel()
         self.images.clear()
         self.undo_stack.clear()
         self.redo_stack.clear()
         self.update_undo_and_redo_actions_requested.emit()
-        file_paths = get_file_paths(directory_path)
-        text_file_paths = {path for path in file_paths
-                           if path.suffix == '.txt'}
-        image_paths = file_paths - text_file_paths
-        image_paths = {path for path in image_paths
-                       if path.suffix.lower() not in ('.json', '.jsonl')}
-        for image_path in image_paths:
-            try:
-                dimensions = imagesize.get(image_path)
-                # Check the orientation tag and rotate the dimensions if
-                # necessary.
-                with open(image_path, 'rb') as image_file:
-                    exif_tags = exifread.process_file(
-                        image_file, details=False,
-                        stop_tag='Image Orientation')
-                    if 'Image Orientation' in exif_tags:
-                        if any(value in exif_tags['Image Orientation'].values
-                               for value in (5, 6, 7, 8)):
-                            dimensions = (dimensions[1], dimensions[0])
-            except (ValueError, OSError) as exception:
-                print(f'Failed to get dimensions for {image_path}: '
-                      f'{exception}')
-                dimensions = None
-            tags = []
-            text_file_path = image_path.with_suffix('.txt')
-            if text_file_path in text_file_paths:
-                # `errors='replace'` inserts a replacement marker such as '?'
-                # when there is malformed data.
-                caption = text_file_path.read_text(encoding='utf-8',
-                                                   errors='replace')
-                if caption:
-                    tags = caption.split(self.separator)
-                    tags = [tag.strip() for tag in tags]
-                    tags = [tag for tag in tags if tag]
-            image = Image(image_path, dimensions, tags)
-            self.images.append(image)
-        self.images.sort(key=lambda image_: image_.path)
-        self.modelReset.emit()
+        self.endResetModel()
+        self.directory_loader = DirectoryLoader(directory_path,
+                                                self.separator)
+        self.directory_loader.signals.batch_loaded.connect(
+            self.add_loaded_images)
+        self.directory_loader.signals.finished.connect(
+            self.finish_loading_directory)
+        QThreadPool.globalInstance().start(self.directory_loader)
+
+    def cancel_loading(self):
+        """Stop loading the directory that is being loaded, if there is one."""
+        if self.directory_loader:
+            self.directory_loader.is_canceled = True
+
+    def is_signal_from_current_directory_loader(self) -> bool:
+        """
+        Check whether a signal was emitted by the current directory loader and
+        not by one that was canceled.
+        """
+        return (self.directory_loader is not None
+                and self.sender() is self.directory_loader.signals)
+
+    @Slot(list)
+    def add_loaded_images(self, images: list[Image]):
+        if not self.is_signal_from_current_directory_loader():
+            return
+        first_row = len(self.images)
+        self.beginInsertRows(QModelIndex(), first_row,
+                             first_row + len(images) - 1)
+        self.images.extend(images)
+        self.endInsertRows()
+
+    @Slot(list)
+    def finish_loading_directory(self, error_messages: list[str]):
+        if not self.is_signal_from_current_directory_loader():
+            return
+        self.directory_loader = None
+        self.beginResetModel()
+        sorted_image_indices = sorted(
+            range(len(self.images)),
+            key=lambda image_index: get_path_sort_key(
+                self.images[image_index].path))
+        self.images[:] = [self.images[image_index]
+                          for image_index in sorted_image_indices]
+        # Any changes made while the images were loading refer to the indices
+        # of the images before sorting, so map them to the new indices.
+        new_image_indices = [0] * len(sorted_image_indices)
+        for new_image_index, old_image_index in enumerate(
+                sorted_image_indices):
+            new_image_indices[old_image_index] = new_image_index
+        for history_item in itertools.chain(self.undo_stack,
+                                            self.redo_stack):
+            history_item.image_tags = {
+                new_image_indices[image_index]: tags
+                for image_index, tags in history_item.image_tags.items()}
+        self.endResetModel()
+        self.directory_loaded.emit()
+        if error_messages:
+            self.show_image_load_error(error_messages)
 
     def add_to_undo_stack(self, action_name: str,
                           should_ask_for_confirmation: bool):
-        """Add the current state of the image tags to the undo stack."""
-        tags = [image.tags.copy() for image in self.images]
-        self.undo_stack.append(HistoryItem(action_name, tags,
+        """
+        Add an item for an action to the undo stack. This must be called
+        before the action changes any tags so that the old tags of the changed
+        images are recorded in the item.
+        """
+        self.undo_stack.append(HistoryItem(action_name, {},
                                            should_ask_for_confirmation))
         self.redo_stack.clear()
         self.update_undo_and_redo_actions_requested.emit()
 
+    def set_image_tags(self, image_index: int, tags: list[str]):
+        """
+        Set the tags of an image and record its old tags in the last undo
+        stack item.
+        """
+        image = self.images[image_index]
+        if self.undo_stack:
+            # Keep the tags from before the first change in the action.
+            self.undo_stack[-1].image_tags.setdefault(image_index, image.tags)
+        image.set_tags(tags)
+
     def write_image_tags_to_disk(self, image: Image):
-        try:
-            image.path.with_suffix('.txt').write_text(
-                self.separator.join(image.tags), encoding='utf-8',
-                errors='replace')
-        except OSError:
-            error_message_box = QMessageBox()
-            error_message_box.setWindowTitle('Error')
-            error_message_box.setIcon(QMessageBox.Icon.Critical)
-            error_message_box.setText(f'Failed to save tags for {image.path}.')
-            error_message_box.exec()
+        """Queue the tags of an image to be written to its text file."""
+        # Join the tags on the main thread so that the caption reflects the
+        # tags at the time of the call.
+        self.write_queue.put((image.path.with_suffix('.txt'),
+                              image.get_caption(self.separator)))
+
+    def write_multiple_image_tags_to_disk(self, images: list[Image]):
+        for image in images:
+            self.write_image_tags_to_disk(image)
+
+    def write_queued_captions(self):
+        """
+        Write the queued captions to their text files. This runs in the writer
+        thread. A single thread is used so that the writes to the same file
+        happen in order.
+        """
+        failed_text_file_paths = []
+        while True:
+            text_file_path, caption = self.write_queue.get()
+            try:
+                text_file_path.write_text(caption, encoding='utf-8',
+                                          errors='replace')
+            except OSError:
+                failed_text_file_paths.append(text_file_path)
+            # Report the failed writes together once the queue is empty
+            # instead of showing an error for each file.
+            if failed_text_file_paths and self.write_queue.empty():
+                self.tags_write_failed.emit(failed_text_file_paths)
+                failed_text_file_paths = []
+            self.write_queue.task_done()
+
+    def flush_writes(self):
+        """Wait until all the queued captions have been written."""
+        self.write_queue.join()
+
+    @Slot(list)
+    def show_tags_write_error(self, failed_text_file_paths: list[Path]):
+        error_message_box = QMessageBox()
+        error_message_box.setWindowTitle('Error')
+        error_message_box.setIcon(QMessageBox.Icon.Critical)
+        failed_count = len(failed_text_file_paths)
+        error_message_box.setText(
+            f'Failed to save tags for {failed_count} '
+            f'{pluralize("image", failed_count)}.')
+        error_message_box.setDetailedText(
+            '\n'.join(str(path) for path in failed_text_file_paths))
+        error_message_box.exec()
+
+    def show_image_load_error(self, error_messages: list[str]):
+        error_message_box = QMessageBox()
+        error_message_box.setWindowTitle('Error')
+        error_message_box.setIcon(QMessageBox.Icon.Critical)
+        failed_count = len(error_messages)
+        error_message_box.setText(
+            f'Failed to load the tags of {failed_count} '
+            f'{pluralize("image", failed_count)}.')
+        error_message_box.setDetailedText('\n'.join(error_messages))
+        error_message_box.exec()
 
     def restore_history_tags(self, is_undo: bool):
         if is_undo:
@@ -173,23 +570,40 @@ class ImageListModel(QAbstractListModel):
             if reply != QMessageBox.StandardButton.Yes:
                 return
         source_stack.pop()
-        tags = [image.tags for image in self.images]
-        destination_stack.append(HistoryItem(
-            history_item.action_name, tags,
-            history_item.should_ask_for_confirmation))
+        # Record the current tags of the changed images so that the action
+        # can be undone or redone again.
+        destination_history_item = HistoryItem(
+            history_item.action_name, {},
+            history_item.should_ask_for_confirmation)
         changed_image_indices = []
-        for image_index, (image, history_image_tags) in enumerate(
-                zip(self.images, history_item.tags)):
+        changed_images = []
+        for image_index, history_image_tags in sorted(
+                history_item.image_tags.items()):
+            image = self.images[image_index]
             if image.tags == history_image_tags:
                 continue
             changed_image_indices.append(image_index)
-            image.tags = history_image_tags
-            self.write_image_tags_to_disk(image)
-        if changed_image_indices:
-            self.dataChanged.emit(self.index(changed_image_indices[0]),
-                                  self.index(changed_image_indices[-1]))
+            destination_history_item.image_tags[image_index] = image.tags
+            image.set_tags(history_image_tags)
+            changed_images.append(image)
+        destination_stack.append(destination_history_item)
+        self.write_multiple_image_tags_to_disk(changed_images)
+        self.emit_data_changed(changed_image_indices)
         self.update_undo_and_redo_actions_requested.emit()
 
+    def emit_data_changed(self, image_indices: list[int]):
+        """
+        Emit `dataChanged` once for each run of consecutive image indices, so
+        that the views only update the rows that changed. The indices must be
+        in ascending order.
+        """
+        for _, run in itertools.groupby(
+                enumerate(image_indices),
+                key=lambda pair: pair[1] - pair[0]):
+            run = list(run)
+            self.dataChanged.emit(self.index(run[0][1]),
+                                  self.index(run[-1][1]))
+
     @Slot()
     def undo(self):
         """Undo the last action."""
@@ -200,18 +614,26 @@ class ImageListModel(QAbstractListModel):
         """Redo the last undone action."""
         self.restore_history_tags(is_undo=False)
 
+    def get_image_indices(self,
+                          in_filtered_images_only: bool) -> Sequence[int]:
+        """
+        Get the indices of all images, or only of the images that match the
+        filter of the image list, in ascending order.
+        """
+        if in_filtered_images_only:
+            return self.proxy_image_list_model.get_filtered_image_indices()
+        return range(len(self.images))
+
     def get_text_match_count(self, text: str, in_filtered_images_only: bool,
                              whole_tags_only: bool) -> int:
         """Get the number of instances of a text in all captions."""
         match_count = 0
-        for image in self.images:
-            if (in_filtered_images_only and not self.proxy_image_list_model
-                    .is_image_in_filtered_images(image)):
-                continue
+        for image_index in self.get_image_indices(in_filtered_images_only):
+            image = self.images[image_index]
             if whole_tags_only:
                 match_count += image.tags.count(text)
             else:
-                caption = self.separator.join(image.tags)
+                caption = image.get_caption(self.separator)
                 match_count += caption.count(text)
         return match_count
 
@@ -225,43 +647,46 @@ class ImageListModel(QAbstractListModel):
             return
         self.add_to_undo_stack(action_name='Find and Replace',
                                should_ask_for_confirmation=True)
+        image_indices = self.get_image_indices(in_filtered_images_only)
+        captions = [self.images[image_index].get_caption(self.separator)
+                    for image_index in image_indices]
+        new_captions = replace_in_captions(captions, find_text, replace_text)
         changed_image_indices = []
-        for image_index, image in enumerate(self.images):
-            if (in_filtered_images_only and not self.proxy_image_list_model
-                    .is_image_in_filtered_images(image)):
-                continue
-            caption = self.separator.join(image.tags)
-            if find_text not in caption:
+        changed_images = []
+        for image_index, caption, new_caption in zip(image_indices, captions,
+                                                      new_captions):
+            if new_caption == caption:
                 continue
             changed_image_indices.append(image_index)
-            caption = caption.replace(find_text, replace_text)
-            image.tags = caption.split(self.separator)
-            self.write_image_tags_to_disk(image)
-        if changed_image_indices:
-            self.dataChanged.emit(self.index(changed_image_indices[0]),
-                                  self.index(changed_image_indices[-1]))
+            self.set_image_tags(image_index,
+                                new_caption.split(self.separator))
+            changed_images.append(self.images[image_index])
+        self.write_multiple_image_tags_to_disk(changed_images)
+        self.emit_data_changed(changed_image_indices)
 
     def sort_tags_alphabetically(self, do_not_reorder_first_tag: bool):
         """Sort the tags for each image in alphabetical order."""
         self.add_to_undo_stack(action_name='Sort Tags',
                                should_ask_for_confirmation=True)
         changed_image_indices = []
+        changed_images = []
         for image_index, image in enumerate(self.images):
             if len(image.tags) < 2:
                 continue
-            old_caption = self.separator.join(image.tags)
             if do_not_reorder_first_tag:
                 first_tag = image.tags[0]
-                image.tags = [first_tag] + sorted(image.tags[1:])
+                new_tags = [first_tag] + sorted(image.tags[1:])
             else:
-                image.tags.sort()
-            new_caption = self.separator.join(image.tags)
-            if new_caption != old_caption:
-                changed_image_indices.append(image_index)
-                self.write_image_tags_to_disk(image)
-        if changed_image_indices:
-            self.dataChanged.emit(self.index(changed_image_indices[0]),
-                                  self.index(changed_image_indices[-1]))
+                new_tags = sorted(image.tags)
+            # Comparing the lists stops at the first difference and does not
+            # need the tags to be joined.
+            if new_tags == image.tags:
+                continue
+            self.set_image_tags(image_index, new_tags)
+            changed_image_indices.append(image_index)
+            changed_images.append(image)
+        self.write_multiple_image_tags_to_disk(changed_images)
+        self.emit_data_changed(changed_image_indices)
 
     def sort_tags_by_frequency(self, tag_counter: Counter,
                                do_not_reorder_first_tag: bool):
@@ -272,44 +697,52 @@ class ImageListModel(QAbstractListModel):
         self.add_to_undo_stack(action_name='Sort Tags',
                                should_ask_for_confirmation=True)
         changed_image_indices = []
+        changed_images = []
+        # Use the bound method as the key instead of a lambda to avoid an extra
+        # Python function call for each tag. `Counter.__missing__()` still
+        # returns 0 for tags that are not in the counter.
+        get_tag_count = tag_counter.__getitem__
+        first_sorted_tag_index = 1 if do_not_reorder_first_tag else 0
         for image_index, image in enumerate(self.images):
-            if len(image.tags) < 2:
+            tags = image.tags
+            if len(tags) < 2:
                 continue
-            old_caption = self.separator.join(image.tags)
-            if do_not_reorder_first_tag:
-                first_tag = image.tags[0]
-                image.tags = [first_tag] + sorted(
-                    image.tags[1:], key=lambda tag: tag_counter[tag],
-                    reverse=True)
-            else:
-                image.tags.sort(key=lambda tag: tag_counter[tag], reverse=True)
-            new_caption = self.separator.join(image.tags)
-            if new_caption != old_caption:
-                changed_image_indices.append(image_index)
-                self.write_image_tags_to_disk(image)
-        if changed_image_indices:
-            self.dataChanged.emit(self.index(changed_image_indices[0]),
-                                  self.index(changed_image_indices[-1]))
+            new_tags = tags[:first_sorted_tag_index] + sorted(
+                tags[first_sorted_tag_index:], key=get_tag_count, reverse=True)
+            # Comparing the lists stops at the first difference and does not
+            # need the tags to be joined.
+            if new_tags == tags:
+                continue
+            self.set_image_tags(image_index, new_tags)
+            changed_image_indices.append(image_index)
+            changed_images.append(image)
+        self.write_multiple_image_tags_to_disk(changed_images)
+        self.emit_data_changed(changed_image_indices)
 
     def shuffle_tags(self, do_not_reorder_first_tag: bool):
         """Shuffle the tags for each image randomly."""
         self.add_to_undo_stack(action_name='Shuffle Tags',
                                should_ask_for_confirmation=True)
         changed_image_indices = []
+        changed_images = []
+        shuffle = random.shuffle
         for image_index, image in enumerate(self.images):
             if len(image.tags) < 2:
                 continue
-            changed_image_indices.append(image_index)
             if do_not_reorder_first_tag:
                 first_tag, *remaining_tags = image.tags
-                random.shuffle(remaining_tags)
-                image.tags = [first_tag] + remaining_tags
+                shuffle(remaining_tags)
+                new_tags = [first_tag] + remaining_tags
             else:
-                random.shuffle(image.tags)
-            self.write_image_tags_to_disk(image)
-        if changed_image_indices:
-            self.dataChanged.emit(self.index(changed_image_indices[0]),
-                                  self.index(changed_image_indices[-1]))
+                new_tags = image.tags.copy()
+                shuffle(new_tags)
+            if new_tags == image.tags:
+                continue
+            self.set_image_tags(image_index, new_tags)
+            changed_image_indices.append(image_index)
+            changed_images.append(image)
+        self.write_multiple_image_tags_to_disk(changed_images)
+        self.emit_data_changed(changed_image_indices)
 
     def remove_duplicate_tags(self) -> int:
         """
@@ -319,6 +752,7 @@ class ImageListModel(QAbstractListModel):
         self.add_to_undo_stack(action_name='Remove Duplicate Tags',
                                should_ask_for_confirmation=True)
         changed_image_indices = []
+        changed_images = []
         removed_tag_count = 0
         for image_index, image in enumerate(self.images):
             tag_count = len(image.tags)
@@ -328,11 +762,10 @@ class ImageListModel(QAbstractListModel):
             changed_image_indices.append(image_index)
             removed_tag_count += tag_count - unique_tag_count
             # Use a dictionary instead of a set to preserve the order.
-            image.tags = list(dict.fromkeys(image.tags))
-            self.write_image_tags_to_disk(image)
-        if changed_image_indices:
-            self.dataChanged.emit(self.index(changed_image_indices[0]),
-                                  self.index(changed_image_indices[-1]))
+            self.set_image_tags(image_index, list(dict.fromkeys(image.tags)))
+            changed_images.append(image)
+        self.write_multiple_image_tags_to_disk(changed_images)
+        self.emit_data_changed(changed_image_indices)
         return removed_tag_count
 
     def remove_empty_tags(self) -> int:
@@ -343,43 +776,54 @@ class ImageListModel(QAbstractListModel):
         self.add_to_undo_stack(action_name='Remove Empty Tags',
                                should_ask_for_confirmation=True)
         changed_image_indices = []
+        changed_images = []
         removed_tag_count = 0
         for image_index, image in enumerate(self.images):
             old_tag_count = len(image.tags)
-            image.tags = [tag for tag in image.tags if tag.strip()]
-            new_tag_count = len(image.tags)
+            new_tags = [tag for tag in image.tags if tag.strip()]
+            new_tag_count = len(new_tags)
             if old_tag_count == new_tag_count:
                 continue
+            self.set_image_tags(image_index, new_tags)
             changed_image_indices.append(image_index)
             removed_tag_count += old_tag_count - new_tag_count
-            self.write_image_tags_to_disk(image)
-        if changed_image_indices:
-            self.dataChanged.emit(self.index(changed_image_indices[0]),
-                                  self.index(changed_image_indices[-1]))
+            changed_images.append(image)
+        self.write_multiple_image_tags_to_disk(changed_images)
+        self.emit_data_changed(changed_image_indices)
         return removed_tag_count
 
     def update_image_tags(self, image_index: QModelIndex, tags: list[str]):
         image: Image = self.data(image_index, Qt.UserRole)
         if image.tags == tags:
             return
-        image.tags = tags
+        self.set_image_tags(image_index.row(), tags)
         self.dataChanged.emit(image_index, image_index)
         self.write_image_tags_to_disk(image)
 
     @Slot(list, list)
     def add_tags(self, tags: list[str], image_indices: list[QModelIndex]):
         """Add one or more tags to one or more images."""
+        # Remove duplicates from the tags while keeping their order, so that
+        # only the tags already in each image have to be filtered out.
+        tags = list(dict.fromkeys(tags))
         action_name = 'Add Tag' if len(tags) == 1 else 'Add Tags'
         should_ask_for_confirmation = len(image_indices) > 1
         self.add_to_undo_stack(action_name, should_ask_for_confirmation)
+        changed_image_indices = []
+        changed_images = []
         for image_index in image_indices:
             image: Image = self.data(image_index, Qt.UserRole)
-            unique_tags = [tag for tag in tags if tag not in image.tags]
-            image.tags.extend(unique_tags)
-            self.write_image_tags_to_disk(image)
-        min_image_index = min(image_indices, key=lambda index: index.row())
-        max_image_index = max(image_indices, key=lambda index: index.row())
-        self.dataChanged.emit(min_image_index, max_image_index)
+            # Set membership tests take constant time, unlike list scans.
+            existing_tags = image.tag_set
+            unique_tags = [tag for tag in tags if tag not in existing_tags]
+            if not unique_tags:
+                continue
+            self.set_image_tags(image_index.row(), image.tags + unique_tags)
+            changed_image_indices.append(image_index.row())
+            changed_images.append(image)
+        self.write_multiple_image_tags_to_disk(changed_images)
+        # The selected image indices are not necessarily in order.
+        self.emit_data_changed(sorted(changed_image_indices))
 
     @Slot(str, str)
     def rename_tag(self, old_tag: str, new_tag: str,
@@ -388,18 +832,25 @@ class ImageListModel(QAbstractListModel):
         self.add_to_undo_stack(action_name='Rename Tag',
                                should_ask_for_confirmation=True)
         changed_image_indices = []
-        for image_index, image in enumerate(self.images):
-            if (in_filtered_images_only and not self.proxy_image_list_model
-                    .is_image_in_filtered_images(image)):
-                continue
-            if old_tag in image.tags:
+        changed_images = []
+        for image_index in self.get_image_indices(in_filtered_images_only):
+            image = self.images[image_index]
+            if old_tag in image.tag_set:
                 changed_image_indices.append(image_index)
-                image.tags = [new_tag if image_tag == old_tag else image_tag
-                              for image_tag in image.tags]
-                self.write_image_tags_to_disk(image)
-        if changed_image_indices:
-            self.dataChanged.emit(self.index(changed_image_indices[0]),
-                                  self.index(changed_image_indices[-1]))
+                # The tags are copied instead of changed in place because the
+                # old list is kept in the undo stack. Copying and searching the
+                # list is done in C, unlike a list comprehension. Each search
+                # starts after the previous match so that the list is only
+                # searched once.
+                new_tags = image.tags.copy()
+                tag_index = -1
+                for _ in range(new_tags.count(old_tag)):
+                    tag_index = new_tags.index(old_tag, tag_index + 1)
+                    new_tags[tag_index] = new_tag
+                self.set_image_tags(image_index, new_tags)
+                changed_images.append(image)
+        self.write_multiple_image_tags_to_disk(changed_images)
+        self.emit_data_changed(changed_image_indices)
 
     @Slot(str)
     def delete_tag(self, tag: str, in_filtered_images_only: bool = False):
@@ -407,15 +858,18 @@ class ImageListModel(QAbstractListModel):
         self.add_to_undo_stack(action_name='Delete Tag',
                                should_ask_for_confirmation=True)
         changed_image_indices = []
-        for image_index, image in enumerate(self.images):
-            if (in_filtered_images_only and not self.proxy_image_list_model
-                    .is_image_in_filtered_images(image)):
-                continue
-            if tag in image.tags:
+        changed_images = []
+        for image_index in self.get_image_indices(in_filtered_images_only):
+            image = self.images[image_index]
+            if tag in image.tag_set:
                 changed_image_indices.append(image_index)
-                image.tags = [image_tag for image_tag in image.tags
-                              if image_tag != tag]
-                self.write_image_tags_to_disk(image)
-        if changed_image_indices:
-            self.dataChanged.emit(self.index(changed_image_indices[0]),
-                                  self.index(changed_image_indices[-1]))
+                # The tags are interned, so the instances of the deleted tag
+                # are usually the same object as it and are filtered out by
+                # the identity check without comparing the strings.
+                self.set_image_tags(
+                    image_index, [image_tag for image_tag in image.tags
+                                  if image_tag is not tag
+                                  and image_tag != tag])
+                changed_images.append(image)
+        self.write_multiple_image_tags_to_disk(changed_images)
+        self.emit_data_changed(changed_image_indices)
@@ -19,7 +19,7 @@ class ProxyImageListModel(QSortFilterProxyModel):
     def does_image_match_filter(self, image: Image,
                                 filter_: list | str) -> bool:
         if isinstance(filter_, str):
-            return (filter_ in self.separator.join(image.tags) or
+            return (filter_ in image.get_caption(self.separator) or
                     filter_ in str(image.path))
         if len(filter_) == 1:
             return self.does_image_match_filter(image, filter_[0])
@@ -27,9 +27,9 @@ class ProxyImageListModel(QSortFilterProxyModel):
             if filter_[0] == 'NOT':
                 return not self.does_image_match_filter(image, filter_[1])
             if filter_[0] == 'tag':
-                return filter_[1] in image.tags
+                return filter_[1] in image.tag_set
             if filter_[0] == 'caption':
-                return filter_[1] in self.separator.join(image.tags)
+                return filter_[1] in image.get_caption(self.separator)
             if filter_[0] == 'name':
                 return filter_[1] in image.path.name
             if filter_[0] == 'path':
@@ -54,10 +54,10 @@ class ProxyImageListModel(QSortFilterProxyModel):
         if filter_[0] == 'tags':
             number_to_compare = len(image.tags)
         elif filter_[0] == 'chars':
-            caption = self.separator.join(image.tags)
+            caption = image.get_caption(self.separator)
             number_to_compare = len(caption)
         elif filter_[0] == 'tokens':
-            caption = self.separator.join(image.tags)
+            caption = image.get_caption(self.separator)
             # Subtract 2 for the `<|startoftext|>` and `<|endoftext|>` tokens.
             number_to_compare = len(self.tokenizer(caption).input_ids) - 2
         return comparison_operator(number_to_compare, int(filter_[2]))
@@ -71,6 +71,11 @@ class ProxyImageListModel(QSortFilterProxyModel):
         image: Image = self.sourceModel().data(image_index, Qt.UserRole)
         return self.does_image_match_filter(image, self.filter)
 
-    def is_image_in_filtered_images(self, image: Image) -> bool:
-        return (self.filter is None
-                or self.does_image_match_filter(image, self.filter))
+    def get_filtered_image_indices(self) -> list[int]:
+        """
+        Get the indices in the source model of the images that match the
+        filter, in ascending order. The filter results that the proxy model
+        already stores are used instead of matching the images again.
+        """
+        return sorted(self.mapToSource(self.index(row, 0)).row()
+                      for row in range(self.rowCount()))
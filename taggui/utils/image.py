@@ -1,6 +1,8 @@
+import sys
 from dataclasses import dataclass, field
 from pathlib import Path
 
+from PySide6.QtCore import QSize
 from PySide6.QtGui import QIcon
 
 
@@ -10,3 +12,35 @@ class Image:
     dimensions: tuple[int, int] | None
     tags: list[str] = field(default_factory=list)
     thumbnail: QIcon | None = None
+    # The size of the thumbnail, or the size it is expected to have before it
+    # is generated. Used as the size hint in the image list.
+    thumbnail_size: QSize | None = field(default=None, repr=False,
+                                         compare=False)
+    # The tags as a set for fast membership tests. The list is still used for
+    # the order of the tags.
+    tag_set: set[str] = field(init=False, repr=False, compare=False)
+    # The separator and the tags joined with it, cached by `get_caption()`.
+    caption_cache: tuple[str, str] | None = field(default=None, repr=False,
+                                                  compare=False)
+
+    def __post_init__(self):
+        self.set_tags(self.tags)
+
+    def set_tags(self, tags: list[str]):
+        """
+        Replace the tags. This must be used instead of assigning or mutating
+        `tags` directly so that `tag_set` and the cached caption are kept up to
+        date.
+        """
+        # Intern the tags because the same tags are usually used for many
+        # images. This stores each distinct tag once and makes comparisons of
+        # equal tags fast.
+        self.tags = [sys.intern(tag) for tag in tags]
+        self.tag_set = set(self.tags)
+        self.caption_cache = None
+
+    def get_caption(self, separator: str) -> str:
+        """Get the tags joined with a separator."""
+        if self.caption_cache is None or self.caption_cache[0] != separator:
+            self.caption_cache = (separator, separator.join(self.tags))
+        return self.caption_cache[1]
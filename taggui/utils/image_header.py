@@ -0,0 +1,210 @@
+import struct
+from pathlib import Path
+from typing import BinaryIO
+
+import imagesize
+from PIL import Image as PilImage
+
+ORIENTATION_TAG = 0x0112
+# Orientations that rotate the image by 90 or 270 degrees.
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+# Start of frame markers, which contain the dimensions of a JPEG image. 0xC4,
+# 0xC8 and 0xCC are other markers in the same range.
+JPEG_START_OF_FRAME_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9,
+                               0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def get_tiff_orientation(tiff_data: bytes) -> int | None:
+    """
+    Get the orientation tag from the first image file directory of TIFF
+    formatted EXIF data.
+    """
+    byte_order = tiff_data[:2]
+    if byte_order == b'II':
+        endianness = '<'
+    elif byte_order == b'MM':
+        endianness = '>'
+    else:
+        return None
+    try:
+        (ifd_offset,) = struct.unpack_from(f'{endianness}I', tiff_data, 4)
+        (entry_count,) = struct.unpack_from(f'{endianness}H', tiff_data,
+                                            ifd_offset)
+        for entry_index in range(entry_count):
+            entry_offset = ifd_offset + 2 + 12 * entry_index
+            (tag,) = struct.unpack_from(f'{endianness}H', tiff_data,
+                                        entry_offset)
+            if tag == ORIENTATION_TAG:
+                # The value is a short stored in the first two bytes of the
+                # value field.
+                (orientation,) = struct.unpack_from(
+                    f'{endianness}H', tiff_data, entry_offset + 8)
+                return orientation
+    except struct.error:
+        return None
+    return None
+
+
+def get_exif_orientation(exif_data: bytes) -> int | None:
+    """Get the orientation tag from EXIF data with an optional header."""
+    exif_header = b'Exif\x00\x00'
+    if exif_data.startswith(exif_header):
+        exif_data = exif_data[len(exif_header):]
+    return get_tiff_orientation(exif_data)
+
+
+def read_exactly(image_file: BinaryIO, size: int) -> bytes:
+    data = image_file.read(size)
+    if len(data) != size:
+        raise ValueError('Unexpected end of file')
+    return data
+
+
+def read_jpeg_header(
+        image_file: BinaryIO) -> tuple[tuple[int, int], int | None]:
+    """
+    Get the dimensions and the orientation of a JPEG image by walking its
+    segments up to the start of frame segment. Only the EXIF segment is read;
+    the other segments are skipped.
+    """
+    orientation = None
+    # Skip the start of image marker.
+    image_file.seek(2)
+    while True:
+        if read_exactly(image_file, 1) != b'\xff':
+            raise ValueError('Invalid JPEG marker')
+        marker = read_exactly(image_file, 1)[0]
+        # Fill bytes.
+        while marker == 0xFF:
+            marker = read_exactly(image_file, 1)[0]
+        # Markers without a length.
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            continue
+        # The image data starts before any start of frame segment was found.
+        if marker in (0xD9, 0xDA):
+            raise ValueError('No JPEG start of frame segment')
+        segment_length = int.from_bytes(read_exactly(image_file, 2), 'big')
+        if marker in JPEG_START_OF_FRAME_MARKERS:
+            # The sample precision comes before the height and the width.
+            _, height, width = struct.unpack('>BHH',
+                                             read_exactly(image_file, 5))
+            return (width, height), orientation
+        if marker == 0xE1 and orientation is None:
+            segment_data = read_exactly(image_file, segment_length - 2)
+            if segment_data.startswith(b'Exif\x00\x00'):
+                orientation = get_exif_orientation(segment_data)
+        else:
+            image_file.seek(segment_length - 2, 1)
+
+
+def read_png_header(
+        image_file: BinaryIO) -> tuple[tuple[int, int], int | None]:
+    """
+    Get the dimensions of a PNG image from its header chunk and the
+    orientation from an EXIF chunk before the image data, if there is one.
+    """
+    # Skip the signature, the length and the type of the header chunk.
+    image_file.seek(16)
+    width, height = struct.unpack('>II', read_exactly(image_file, 8))
+    # Skip the rest of the header chunk and its CRC.
+    image_file.seek(9, 1)
+    while True:
+        chunk_header = image_file.read(8)
+        if len(chunk_header) < 8:
+            return (width, height), None
+        chunk_length, chunk_type = struct.unpack('>I4s', chunk_header)
+        if chunk_type in (b'IDAT', b'IEND'):
+            return (width, height), None
+        if chunk_type == b'eXIf':
+            exif_data = read_exactly(image_file, chunk_length)
+            return (width, height), get_exif_orientation(exif_data)
+        # Skip the chunk data and its CRC.
+        image_file.seek(chunk_length + 4, 1)
+
+
+def read_webp_header(
+        image_file: BinaryIO) -> tuple[tuple[int, int], int | None]:
+    """
+    Get the dimensions of a WebP image from its first chunk and the
+    orientation from its EXIF chunk, if there is one.
+    """
+    image_file.seek(12)
+    chunk_type, chunk_length = struct.unpack('<4sI',
+                                             read_exactly(image_file, 8))
+    chunk_data = read_exactly(image_file, min(chunk_length, 30))
+    if chunk_type == b'VP8 ':
+        # The dimensions come after the frame tag and the start code.
+        width, height = struct.unpack_from('<HH', chunk_data, 6)
+        return (width & 0x3FFF, height & 0x3FFF), None
+    if chunk_type == b'VP8L':
+        # The dimensions minus one are packed into 14 bits each after the
+        # signature byte.
+        bits = int.from_bytes(chunk_data[1:5], 'little')
+        return ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1), None
+    if chunk_type != b'VP8X':
+        raise ValueError('Unknown WebP chunk type')
+    flags = chunk_data[0]
+    # The dimensions minus one are stored in 24 bits each.
+    width = int.from_bytes(chunk_data[4:7], 'little') + 1
+    height = int.from_bytes(chunk_data[7:10], 'little') + 1
+    has_exif = flags & 0x08
+    if not has_exif:
+        return (width, height), None
+    # Chunks are padded to an even length.
+    image_file.seek(20 + chunk_length + chunk_length % 2)
+    while True:
+        chunk_header = image_file.read(8)
+        if len(chunk_header) < 8:
+            return (width, height), None
+        chunk_type, chunk_length = struct.unpack('<4sI', chunk_header)
+        if chunk_type == b'EXIF':
+            exif_data = read_exactly(image_file, chunk_length)
+            return (width, height), get_exif_orientation(exif_data)
+        image_file.seek(chunk_length + chunk_length % 2, 1)
+
+
+def get_pillow_orientation(image_path: Path) -> int | None:
+    """
+    Get the EXIF orientation tag of an image in a format that is not parsed
+    here without reading its pixel data.
+    """
+    # Pillow only reads the header when opening an image.
+    with PilImage.open(image_path) as pil_image:
+        return pil_image.getexif().get(ORIENTATION_TAG)
+
+
+def get_image_dimensions(image_path: Path) -> tuple[int, int]:
+    """
+    Get the dimensions of an image, swapped if the EXIF orientation tag
+    rotates it by 90 or 270 degrees. The dimensions and the orientation of
+    JPEG, PNG, GIF and WebP images are read from the header in a single pass
+    over the file.
+    """
+    with open(image_path, 'rb') as image_file:
+        signature = image_file.read(12)
+        try:
+            if signature.startswith(b'\xff\xd8'):
+                dimensions, orientation = read_jpeg_header(image_file)
+            elif signature.startswith(b'\x89PNG\r\n\x1a\n'):
+                dimensions, orientation = read_png_header(image_file)
+            elif signature[:6] in (b'GIF87a', b'GIF89a'):
+                dimensions = struct.unpack_from('<HH', signature, 6)
+                orientation = None
+            elif signature.startswith(b'RIFF') and signature[8:] == b'WEBP':
+                dimensions, orientation = read_webp_header(image_file)
+            else:
+                dimensions = None
+                orientation = None
+        except struct.error as exception:
+            raise ValueError(str(exception)) from exception
+    if dimensions is None:
+        dimensions = imagesize.get(image_path)
+        try:
+            orientation = get_pillow_orientation(image_path)
+        except (OSError, PilImage.DecompressionBombError):
+            # Pillow cannot open some of the formats that imagesize supports,
+            # and it refuses to open very large images.
+            orientation = None
+    if orientation in ROTATED_ORIENTATIONS:
+        dimensions = (dimensions[1], dimensions[0])
+    return dimensions
@@ -163,7 +163,7 @@ class ImageListView(QListView):
     @Slot()
     def copy_selected_image_tags(self):
         selected_images = self.get_selected_images()
-        selected_image_captions = [self.separator.join(image.tags)
+        selected_image_captions = [image.get_caption(self.separator)
                                    for image in selected_images]
         QApplication.clipboard().setText('\n'.join(selected_image_captions))
 
@@ -214,6 +214,8 @@ class ImageListView(QListView):
         if not move_directory_path:
             return
         move_directory_path = Path(move_directory_path)
+        # Make sure that the caption files are up to date before moving them.
+        self.proxy_image_list_model.sourceModel().flush_writes()
         for image in selected_images:
             try:
                 image.path.replace(move_directory_path / image.path.name)
@@ -240,6 +242,8 @@ class ImageListView(QListView):
         if not copy_directory_path:
             return
         copy_directory_path = Path(copy_directory_path)
+        # Make sure that the caption files are up to date before copying them.
+        self.proxy_image_list_model.sourceModel().flush_writes()
         for image in selected_images:
             try:
                 shutil.copy(image.path, copy_directory_path)
@@ -263,6 +267,8 @@ class ImageListView(QListView):
         reply = get_confirmation_dialog_reply(title, question)
         if reply != QMessageBox.StandardButton.Yes:
             return
+        # Make sure that no caption files are written after they are deleted.
+        self.proxy_image_list_model.sourceModel().flush_writes()
         for image in selected_images:
             image_file = QFile(image.path)
             if not image_file.moveToTrash():
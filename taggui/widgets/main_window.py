@@ -1,7 +1,7 @@
 from pathlib import Path
 
-from PySide6.QtCore import (QItemSelection, QKeyCombination, QModelIndex, QUrl,
-                            Qt, Slot)
+from PySide6.QtCore import (QItemSelection, QKeyCombination, QModelIndex,
+                            QTimer, QUrl, Qt, Slot)
 from PySide6.QtGui import (QAction, QCloseEvent, QDesktopServices, QIcon,
                            QKeySequence, QPixmap, QShortcut)
 from PySide6.QtWidgets import (QApplication, QFileDialog, QMainWindow,
@@ -89,6 +89,13 @@ class MainWindow(QMainWindow):
         self.auto_captioner.caption_button.setDisabled(True)
         self.reload_directory_action = QAction('Reload Directory', parent=self)
         self.reload_directory_action.setDisabled(True)
+        self.select_index_after_loading = 0
+        self.tag_count_timer = QTimer(self)
+        self.tag_count_timer.setSingleShot(True)
+        self.tag_count_timer.setInterval(0)
+        self.tag_count_timer.timeout.connect(
+            lambda: self.tag_counter_model.count_tags(
+                self.image_list_model.images))
         self.undo_action = QAction('Undo', parent=self)
         self.redo_action = QAction('Redo', parent=self)
         self.toggle_image_list_action = QAction('Images', parent=self)
@@ -166,9 +173,16 @@ class MainWindow(QMainWindow):
         self.image_tags_editor.tag_input_box.setFocus()
 
     def closeEvent(self, event: QCloseEvent):
-        """Save the window geometry and state before closing."""
+        """
+        Save the window geometry and state, stop loading the directory, and
+        finish writing the tags to disk before closing.
+        """
         self.settings.setValue('geometry', self.saveGeometry())
         self.settings.setValue('window_state', self.saveState())
+        # The application waits for the directory loader thread to finish
+        # before exiting.
+        self.image_list_model.cancel_loading()
+        self.image_list_model.flush_writes()
         super().closeEvent(event)
 
     def set_font_size(self):
@@ -193,18 +207,28 @@ class MainWindow(QMainWindow):
     def load_directory(self, path: Path, select_index: int = 0):
         self.settings.setValue('directory_path', str(path))
         self.setWindowTitle(path.name)
+        # The image is selected once the directory has finished loading.
+        self.select_index_after_loading = select_index
         self.image_list_model.load_directory(path)
         self.image_list.filter_line_edit.clear()
         self.all_tags_editor.filter_line_edit.clear()
+        self.centralWidget().setCurrentWidget(self.image_viewer)
+        self.reload_directory_action.setDisabled(False)
+        self.image_tags_editor.tag_input_box.setDisabled(False)
+        self.auto_captioner.caption_button.setDisabled(False)
+
+    @Slot()
+    def select_image_after_loading(self):
+        select_index = self.select_index_after_loading
+        # If the selected image index is out of bounds due to images being
+        # deleted, select the last image.
+        if select_index >= self.proxy_image_list_model.rowCount():
+            select_index = self.proxy_image_list_model.rowCount() - 1
         # Clear the current index first to make sure that the `currentChanged`
         # signal is emitted even if the image at the index is already selected.
         self.image_list_selection_model.clearCurrentIndex()
         self.image_list.list_view.setCurrentIndex(
             self.proxy_image_list_model.index(select_index, 0))
-        self.centralWidget().setCurrentWidget(self.image_viewer)
-        self.reload_directory_action.setDisabled(False)
-        self.image_tags_editor.tag_input_box.setDisabled(False)
-        self.auto_captioner.caption_button.setDisabled(False)
 
     @Slot()
     def select_and_load_directory(self):
@@ -229,14 +253,9 @@ class MainWindow(QMainWindow):
                             if self.proxy_image_list_model.filter is None
                             else 'filtered_image_index')
         select_index = self.settings.value(select_index_key, type=int) or 0
-        self.load_directory(Path(self.settings.value('directory_path')))
+        self.load_directory(Path(self.settings.value('directory_path')),
+                            select_index=select_index)
         self.image_list.filter_line_edit.setText(filter_text)
-        # If the selected image index is out of bounds due to images being
-        # deleted, select the last image.
-        if select_index >= self.proxy_image_list_model.rowCount():
-            select_index = self.proxy_image_list_model.rowCount() - 1
-        self.image_list.list_view.setCurrentIndex(
-            self.proxy_image_list_model.index(select_index, 0))
 
     @Slot()
     def show_settings_dialog(self):
@@ -421,13 +440,15 @@ class MainWindow(QMainWindow):
         self.image_list_model.modelReset.connect(
             lambda: self.tag_counter_model.count_tags(
                 self.image_list_model.images))
-        self.image_list_model.dataChanged.connect(
-            lambda: self.tag_counter_model.count_tags(
-                self.image_list_model.images))
+        # A bulk change can emit `dataChanged` once for each run of changed
+        # images, so count the tags once after all the signals.
+        self.image_list_model.dataChanged.connect(self.tag_count_timer.start)
         self.image_list_model.dataChanged.connect(
             self.image_tags_editor.reload_image_tags_if_changed)
         self.image_list_model.update_undo_and_redo_actions_requested.connect(
             self.update_undo_and_redo_actions)
+        self.image_list_model.directory_loaded.connect(
+            self.select_image_after_loading)
         # Rows are inserted or removed from the proxy image list model when the
         # filter is changed.
         self.proxy_image_list_model.rowsInserted.connect(